@@ -0,0 +1,69 @@
+"""
+DataFrame.to_sqlでCOPY ... FROM STDINを使って書き込むモジュール。
+"""
+import io
+from typing import Any
+
+from sqlalchemy import Connection
+
+# COPYでNULLを表す文字列。NULL以外の値はすべてクォートして書き出すため、
+# クォートされていないこの文字列だけがNULLになる
+COPY_NULL = r"\N"
+
+
+def _csv_field(value: Any) -> str:
+    """
+    COPYに送るCSVのフィールドを作る。
+    CSVではクォートされた値はNULLにならないため、NULL以外の値はすべて
+    クォートし、空文字や"\\N"という文字列がNULLと区別されるようにする。
+
+    Args:
+        value (Any): 書き込む値
+
+    Returns:
+        str: CSVのフィールド
+    """
+    if value is None:
+        return COPY_NULL
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def copy_from_csv(table, conn: Connection, keys: list[str], data_iter) -> int:
+    """
+    DataFrame.to_sqlのmethodとして使う、COPY ... FROM STDINによる書き込み。
+    行をCSVとしてメモリ上のバッファに書き出し、psycopg2のcopy_expertで
+    1回のCOPYとして送る。
+
+    Args:
+        table (pandas.io.sql.SQLTable): 書き込み先のテーブル
+        conn (Connection): sqlalchemyのコネクション
+        keys (list[str]): カラム名のリスト
+        data_iter (Iterable): 書き込む行のイテレータ
+
+    Returns:
+        int: 書き込んだ行数
+    """
+    buffer = io.StringIO()
+    buffer.writelines(
+        ",".join(_csv_field(value) for value in row) + "\n"
+        for row in data_iter
+    )
+    buffer.seek(0)
+
+    preparer = conn.dialect.identifier_preparer
+    table_name = preparer.quote(table.name)
+    if table.schema:
+        table_name = f"{preparer.quote_schema(table.schema)}.{table_name}"
+    columns = ", ".join(preparer.quote(key) for key in keys)
+    # テーブル名とカラム名はidentifier_preparerでクォートしている
+    query = (
+        f"COPY {table_name} ({columns}) FROM STDIN "  # nosec B608
+        f"WITH (FORMAT csv, NULL '{COPY_NULL}')"
+    )
+
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(query, buffer)
+        return cursor.rowcount
+    finally:
+        cursor.close()
@@ -1,40 +1,114 @@
 """
 databaseを管理するモジュール。
 """
+import atexit
+import re
 import threading
-from functools import wraps
-from typing import Any, Literal
+import weakref
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+from typing import Any, Callable, Iterator, Literal, Sequence
 
 import pandas as pd
 from sqlalchemy import (
     Connection,
+    CursorResult,
     MetaData,
+    Row,
+    TextClause,
     Transaction,
-    create_engine,
-    inspect,
+    insert,
     text,
 )
-from sqlalchemy.engine.interfaces import ReflectedColumn
-from sqlalchemy.exc import IntegrityError, OperationalError, SQLAlchemyError
-from sqlalchemy_utils import create_database, database_exists, drop_database
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.pool import Pool, StaticPool
 
-from libs.utils.convert_type.pandas_sql import convert_sql_type_to_pd_type
+from libs.sqlmy.csv_copy import copy_from_csv
+from libs.sqlmy.engine import get_engine
+from libs.sqlmy.schema import SchemaCache, SchemaMixin
+from libs.sqlmy.transaction import TransactionStack
 from libs.utils.singleton import SingletonMeta
 
+# COPYで一度に送る行数
+COPY_CHUNK_SIZE = 50_000
 
-class Database(metaclass=SingletonMeta):
+# 複数行のINSERT文1つにまとめる行数
+MULTI_INSERT_CHUNK_SIZE = 1000
+
+
+# クエリの先頭の空白を読み飛ばし、最初の単語を取り出す
+_SQL_VERB_PATTERN = re.compile(r"\s*(\w*)")
+
+
+def _sql_verb(query: str) -> str:
+    """
+    クエリの最初の単語(SELECT、INSERTなど)を大文字で返す。
+    クエリ全体ではなく先頭のトークンだけを走査する。
+
+    Args:
+        query (str): クエリ文字列
+
+    Returns:
+        str: クエリの最初の単語
+    """
+    match = _SQL_VERB_PATTERN.match(query)
+    return match.group(1).upper() if match else ""
+
+
+@lru_cache(maxsize=256)
+def _prepare(query: str | TextClause) -> tuple[TextClause, str]:
+    """
+    クエリ文字列からTextClauseを作成し、クエリの最初の単語とあわせて返す。
+    同じクエリ文字列に対しては作成済みの結果を返し、
+    バインドパラメータの解析や単語の判定を繰り返さない。
+    TextClauseが渡された場合はそのまま使う。
+
+    Args:
+        query (str | TextClause): クエリ文字列またはTextClause
+
+    Returns:
+        tuple[TextClause, str]: クエリのTextClauseとクエリの最初の単語
+    """
+    if isinstance(query, TextClause):
+        return query, _sql_verb(query.text)
+    return text(query), _sql_verb(query)
+
+
+def _close_at_exit(database_ref: "weakref.ref[Database]"):
+    """
+    インタプリタの終了時にデータベースが残っていれば閉じる。
+    atexitがDatabaseへの参照を持ち続けないよう、弱参照で受け取る。
+
+    Args:
+        database_ref (weakref.ref): Databaseへの弱参照
+    """
+    database = database_ref()
+    if database is not None:
+        database.close()
+
+
+class Database(SchemaMixin, metaclass=SingletonMeta):
     """
     sqlalchemyのエンジンと接続を管理するクラス。
 
     Attributes:
         metadata (MetaData): sqlalchemyのMetaDataオブジェクト
         engine (Engine): sqlalchemyのエンジン
-        connection (Connection): sqlalchemyのコネクション
-        trans (RootTransaction): sqlalchemyのトランザクション
-        initialized (bool): 初期化済みかどうかを表すフラグ
+        connection (Connection): 呼び出し元のスレッドのsqlalchemyのコネクション
+        trans (list[Transaction]): 呼び出し元のスレッドのsqlalchemyのトランザクション
+        initialized (bool): 呼び出し元のスレッドで初期化済みかどうかを表すフラグ
+
+    コネクションとトランザクションはスレッドごとに保持するため、
+    スレッド間でロックを取らずに並行してクエリを実行できる。
     """
 
-    def __init__(self, metadata: MetaData, engine_url: str):
+    def __init__(
+        self,
+        metadata: MetaData,
+        engine_url: str,
+        poolclass: type[Pool] | None = None,
+        **engine_options,
+    ):
         """
         Databaseのコンストラクタ。
 
@@ -52,21 +126,81 @@ class Database(metaclass=SingletonMeta):
                 host: データベースのホスト名またはIPアドレス。
                 port: データベースのポート番号。
                 database: 接続するデータベース名。
+            poolclass (type[Pool] | None, optional): 使用するプールのクラス。
+                指定しない場合はengine_urlに応じたプールを使う。
+                Defaults to None.
+            **engine_options: create_engineに渡す設定。
+                pool_pre_pingなど、engine_urlに応じた設定を上書きする。
         """
         self.metadata = metadata
-        self.engine = create_engine(engine_url)
-        self.connection: Connection | None = None
-        self.trans: list[Transaction] = []
-        self.initialized = False
-        self._lock = threading.Lock()
+        self.engine = get_engine(engine_url, poolclass, **engine_options)
+        self._local = threading.local()
+        # closeで全スレッドのコネクションを閉じられるよう、開いたものを記録する
+        self._connections: weakref.WeakSet[Connection] = weakref.WeakSet()
+        self._connections_lock = threading.Lock()
+        self._schema = SchemaCache()
+        atexit.register(_close_at_exit, weakref.ref(self))
+
+    @property
+    def connection(self) -> Connection | None:
+        """
+        呼び出し元のスレッドのコネクションを返す。
+        closeで閉じられている場合は、このスレッドの接続の状態を破棄してNoneを返す。
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and connection.closed:
+            self._reset_local()
+            return None
+        return connection
+
+    @connection.setter
+    def connection(self, connection: Connection | None):
+        self._local.connection = connection
+
+    @property
+    def trans(self) -> TransactionStack:
+        """
+        呼び出し元のスレッドのトランザクションのスタックを返す。
+        """
+        if not hasattr(self._local, "trans"):
+            self._local.trans = TransactionStack()
+        return self._local.trans
+
+    @trans.setter
+    def trans(self, trans: TransactionStack):
+        self._local.trans = trans
+
+    @property
+    def initialized(self) -> bool:
+        """
+        呼び出し元のスレッドで接続済みかどうかを返す。
+        """
+        if self.connection is None:
+            return False
+        return getattr(self._local, "initialized", False)
+
+    @initialized.setter
+    def initialized(self, initialized: bool):
+        self._local.initialized = initialized
+
+    def _reset_local(self):
+        """
+        呼び出し元のスレッドの接続とトランザクションの状態を初期化する。
+        """
+        self._local.connection = None
+        self._local.initialized = False
+        self._local.trans = TransactionStack()
 
     def connect(self):
         """
         データベースに接続する。接続が既に確立されている場合は何もしない。
         """
         if not self.connection:
-            self.connection = self.engine.connect()
-            self.initialized = True
+            connection = self.engine.connect()
+            with self._connections_lock:
+                self._connections.add(connection)
+            self._local.connection = connection
+            self._local.initialized = True
 
     def disconnect(self):
         """
@@ -76,10 +210,37 @@ class Database(metaclass=SingletonMeta):
         トランザクションが開始されている場合はロールバックされる
         """
         if self.connection:
+            with self._connections_lock:
+                self._connections.discard(self.connection)
             self.connection.close()
-            self.connection = None
-            self.initialized = False
-            self.trans = []
+            self._reset_local()
+
+    def close(self):
+        """
+        データベースから切断し、プールしているコネクションをすべて解放する。
+        他のスレッドが切断せずに残したコネクションも閉じる。
+        インタプリタの終了時にも呼び出される。
+        """
+        self.disconnect()
+        with self._connections_lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for connection in connections:
+            connection.close()
+        self.engine.dispose()
+
+    def __enter__(self) -> "Database":
+        """
+        データベースに接続し、自身を返す。
+        """
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """
+        データベースから切断する。
+        """
+        self.disconnect()
 
     @staticmethod
     def _ensure_connection(func):
@@ -109,40 +270,39 @@ class Database(metaclass=SingletonMeta):
 
         return wrapper
 
-    @_ensure_connection
-    def create_tables(self):
+    @staticmethod
+    def _error_started_transaction(func):
         """
-        初期化されていない場合、初期化し、テーブルを作成する。
+        トランザクションが開始されている場合に発生するエラー。
         """
-        self.metadata.create_all(self.engine)
-        self.metadata.reflect(bind=self.engine)
 
-    @_ensure_connection
-    def create_table(self, table_name: str):
-        """
-        指定されたテーブルを作成する。
-
-        Args:
-            table_name (str): 作成するテーブルの名前。
+        @wraps(func)
+        def wrapper(self: "Database", *args, **kwargs):
+            if self.trans:
+                raise SQLAlchemyError("Transaction is already started.")
+            return func(self, *args, **kwargs)
 
-        Raises:
-            ValueError: テーブルがmetadataに登録されていない場合
-        """
-        if table_name not in self.metadata.tables:
-            raise ValueError(f"Table {table_name} is not defined in metadata.")
-        if self.exists_table(table_name):
-            return
-        if not self.connection:
-            raise SQLAlchemyError("Database is not initialized.")
-        table = self.metadata.tables[table_name]
-        if not self.engine.dialect.has_table(self.connection, table_name):
-            table.create(self.engine)
+        return wrapper
 
-    def get_registered_tables(self) -> list[str]:
+    @staticmethod
+    def _error_shared_connection_in_transaction(func):
         """
-        metadataに登録されているテーブルの名前のリストを返す。
+        StaticPoolのエンジンでトランザクションの開始中に
+        別のコネクションを使おうとした場合に発生するエラー。
+        StaticPoolでは別のコネクションも同じDBAPIコネクションになるため、
+        そのまま実行すると開始中のトランザクションがコミットされてしまう。
         """
-        return list(self.metadata.tables.keys())
+
+        @wraps(func)
+        def wrapper(self: "Database", *args, **kwargs):
+            if isinstance(self.engine.pool, StaticPool) and self.trans:
+                raise SQLAlchemyError(
+                    "Cannot use a separate connection while a transaction "
+                    "is open on a StaticPool engine."
+                )
+            return func(self, *args, **kwargs)
+
+        return wrapper
 
     @_ensure_connection
     def start_transaction(self):
@@ -151,15 +311,14 @@ class Database(metaclass=SingletonMeta):
         """
         if self.connection.in_transaction():
             raise SQLAlchemyError("Transaction is already started.")
-        if not self.trans:
-            self.trans.append(self.connection.begin())
+        self.trans.begin(self.connection)
 
     @_ensure_connection
     def start_nested_transaction(self):
         """
         ネストされたトランザクションを開始する。
         """
-        self.trans.append(self.connection.begin_nested())
+        self.trans.begin_nested(self.connection)
 
     @_error_not_start_transaction
     @_ensure_connection
@@ -170,8 +329,7 @@ class Database(metaclass=SingletonMeta):
         Raises:
             SQLAlchemyError: トランザクションが開始されていない場合
         """
-        current_trans = self.trans.pop()
-        current_trans.commit()
+        self.trans.commit()
 
     @_error_not_start_transaction
     def rollback_transaction(self):
@@ -181,17 +339,61 @@ class Database(metaclass=SingletonMeta):
         Raises:
             SQLAlchemyError: トランザクションが開始されていない場合
         """
-        current_trans = self.trans.pop()
-        current_trans.rollback()
+        self.trans.rollback()
+
+    @contextmanager
+    def transaction(self) -> Iterator["Database"]:
+        """
+        トランザクションを開始し、ブロックを抜けるときにコミットする。
+        ブロック内で例外が発生した場合はロールバックして例外を送出する。
+
+        Yields:
+            Database: このインスタンス
+
+        Raises:
+            SQLAlchemyError: すでにトランザクションが開始されている場合
+        """
+        self.start_transaction()
+        with self._end_transaction_on_exit():
+            yield self
+
+    @contextmanager
+    def savepoint(self) -> Iterator["Database"]:
+        """
+        ネストされたトランザクション(SAVEPOINT)を開始し、
+        ブロックを抜けるときにコミットする。
+        ブロック内で例外が発生した場合はSAVEPOINTまでロールバックして例外を送出する。
+
+        Yields:
+            Database: このインスタンス
+        """
+        self.start_nested_transaction()
+        with self._end_transaction_on_exit():
+            yield self
+
+    @contextmanager
+    def _end_transaction_on_exit(self) -> Iterator[None]:
+        """
+        直前に開始したトランザクションを、ブロックを抜けるときに終了する。
+        execute_queryがエラー時にロールバック済みの場合は二重にロールバックしない。
+        """
+        depth = len(self.trans)
+        try:
+            yield
+        except BaseException:
+            if len(self.trans) == depth:
+                self.rollback_transaction()
+            raise
+        self.commit_transaction()
 
     @_error_not_start_transaction
     @_ensure_connection
-    def execute_query(self, query: str, **params) -> Any:
+    def execute_query(self, query: str | TextClause, **params) -> Any:
         """
         与えられたクエリを実行し、結果を返す。
 
         Args:
-            query (str): 実行するクエリ
+            query (str | TextClause): 実行するクエリ
             **params: クエリに渡すパラメータ
 
         Returns:
@@ -205,143 +407,244 @@ class Database(metaclass=SingletonMeta):
         if not self.connection:
             raise SQLAlchemyError("Database is not initialized.")
         try:
-            result_proxy = self.connection.execute(text(query), params)
-
-            # クエリがSELECT文かどうかを確認
-            if query.strip().upper().startswith("SELECT"):
-                return result_proxy.fetchall()
-            if query.strip().upper().startswith("INSERT"):
-                return result_proxy.lastrowid  # 挿入された行のIDを返す
-            return result_proxy.rowcount  # 影響を受けた行数を返す
-        except IntegrityError as error:
+            statement, verb = _prepare(query)
+            result_proxy = self.connection.execute(statement, params)
+            return self._fetch_result(result_proxy, verb)
+        except SQLAlchemyError:
+            # IntegrityError、OperationalErrorもここで捕捉される。
+            # 失敗したトランザクションをロールバックし、元の例外をそのまま送出する
             self.rollback_transaction()
-            # 一意性制約違反のエラーに関するハンドリング
-            raise error
-
-        except OperationalError as error:
-            self.rollback_transaction()
-            # データベースの接続エラーに関するハンドリング
-            raise error
-
-        except SQLAlchemyError as error:
-            self.rollback_transaction()
-            # SQLAlchemyのエラーに関するハンドリング
-            raise error
+            raise
 
+    @_error_not_start_transaction
     @_ensure_connection
-    def execute_query_with_transaction(self, query: str, **params) -> Any:
+    def execute_scalar(self, query: str | TextClause, **params) -> Any:
         """
-        与えられたクエリをトランザクション内で実行する。
+        与えられたクエリを実行し、最初の行の最初の列の値を返す。
+        COUNT(*)のように1つの値だけを返すクエリに使う。
 
         Args:
-            query (str): 実行するクエリ
+            query (str | TextClause): 実行するクエリ
             **params: クエリに渡すパラメータ
 
         Returns:
-            クエリの結果。SELECT文の場合は結果セット、INSERT文の場合は最後の行ID、その他の場合は影響を受けた行数。
+            Any: 最初の行の最初の列の値。行がない場合はNone
 
+        Raises:
+            SQLAlchemyError: クエリの実行に失敗した場合
         """
-        with self._lock:
-            self.start_transaction()
-            result = self.execute_query(query, **params)
-            self.commit_transaction()
-        return result
+        if not self.connection:
+            raise SQLAlchemyError("Database is not initialized.")
+        try:
+            statement, _ = _prepare(query)
+            return self.connection.execute(statement, params).scalar()
+        except SQLAlchemyError:
+            self.rollback_transaction()
+            raise
 
-    def exists_table(self, table_name: str) -> bool:
+    @_error_not_start_transaction
+    @_ensure_connection
+    def execute_many(
+        self, query: str | TextClause, params_seq: list[dict[str, Any]]
+    ) -> int:
         """
-        指定されたテーブルが存在するかどうかを返す。
+        与えられたクエリを複数のパラメータでまとめて実行する。
+        パラメータのリストはexecutemanyとして1回でドライバに渡される。
 
         Args:
-            table_name (str): テーブル名
+            query (str | TextClause): 実行するクエリ
+            params_seq (list[dict]): クエリに渡すパラメータのリスト
 
         Returns:
-            bool: テーブルが存在するかどうか
+            int: ドライバが返した影響を受けた行数。
+                psycopg2でまとめて送った場合は最後のバッチの行数になる。
+
+        Raises:
+            SQLAlchemyError: クエリの実行に失敗した場合
         """
-        inspector = inspect(self.engine)
-        return table_name in inspector.get_table_names()
+        if not self.connection:
+            raise SQLAlchemyError("Database is not initialized.")
+        try:
+            statement, _ = _prepare(query)
+            return self.connection.execute(statement, params_seq).rowcount
+        except SQLAlchemyError:
+            self.rollback_transaction()
+            raise
 
-    def drop_table(self, table_name: str):
+    @_error_not_start_transaction
+    @_ensure_connection
+    def bulk_insert(self, table_name: str, rows: list[dict[str, Any]]) -> None:
         """
-        指定されたテーブルを削除する。
+        metadataに登録されたテーブルに複数の行を挿入する。
+        行はexecutemanyとしてまとめてドライバに渡され、
+        psycopg2の場合は複数行のVALUESを持つINSERT文で送られる。
 
         Args:
-            table_name (str): テーブル名
+            table_name (str): 挿入先のテーブル名
+            rows (list[dict]): 挿入する行。キーはカラム名
 
         Raises:
-            SQLAlchemyError: テーブルが存在しない場合
+            ValueError: テーブルがmetadataに登録されていない場合
+            SQLAlchemyError: クエリの実行に失敗した場合
         """
-        if self.exists_table(table_name):
-            self.metadata.tables[table_name].drop(self.engine)
-        else:
-            raise SQLAlchemyError(f"Table {table_name} does not exist.")
+        if table_name not in self.metadata.tables:
+            raise ValueError(f"Table {table_name} is not defined in metadata.")
+        if not rows:
+            return
+        if not self.connection:
+            raise SQLAlchemyError("Database is not initialized.")
+        try:
+            self.connection.execute(
+                insert(self.metadata.tables[table_name]), rows
+            )
+        except SQLAlchemyError:
+            self.rollback_transaction()
+            raise
 
-    def create_database(self):
-        """
-        データベースを作成する。
+    @_error_not_start_transaction
+    @_ensure_connection
+    def execute_query_stream(
+        self, query: str | TextClause, chunk_size: int = 10_000, **params
+    ) -> Iterator[Sequence[Row]]:
         """
-        if not database_exists(self.engine.url):
-            create_database(self.engine.url)
+        SELECT文をサーバーサイドカーソルで実行し、結果をchunk_size行ずつ返す。
+        結果セット全体をメモリに読み込まないため、大きな結果を扱う場合に使う。
+        サーバーサイドカーソルはトランザクションの終了時に閉じられるため、
+        返されたイテレータはクエリを実行したトランザクションの中で読み切る必要がある。
 
-    def drop_database(self):
-        """
-        データベースを削除する。
+        Args:
+            query (str | TextClause): 実行するSELECT文
+            chunk_size (int, optional): 一度に取得する行数。Defaults to 10_000.
+            **params: クエリに渡すパラメータ
+
+        Returns:
+            Iterator[Sequence[Row]]: chunk_size行以下の結果を返すイテレータ
+
+        Raises:
+            SQLAlchemyError: クエリの実行に失敗した場合
         """
-        if database_exists(self.engine.url):
-            drop_database(self.engine.url)
+        if not self.connection:
+            raise SQLAlchemyError("Database is not initialized.")
+        transaction = self.trans[-1]
+        try:
+            statement, _ = _prepare(query)
+            result_proxy = self.connection.execute(
+                statement,
+                params,
+                execution_options={
+                    "stream_results": True,
+                    "max_row_buffer": chunk_size,
+                },
+            )
+        except SQLAlchemyError:
+            self.rollback_transaction()
+            raise
+        return self._iter_partitions(result_proxy, chunk_size, transaction)
 
-    def exists_database(self) -> bool:
+    def _iter_partitions(
+        self,
+        result_proxy: CursorResult,
+        chunk_size: int,
+        transaction: Transaction,
+    ) -> Iterator[Sequence[Row]]:
         """
-        データベースが存在するかどうかを返す。
+        execute_query_streamの結果をchunk_size行ずつ返す。
+        読み込みに失敗した場合は、クエリを実行したトランザクションが
+        まだ開始中の場合に限りロールバックする。
+        コミット後や、後から別のトランザクションを開始した後に読み込んだ場合は
+        ロールバックせず、元の例外をそのまま送出する。
 
-        Returns:
-            bool: データベースが存在するかどうか
+        Args:
+            result_proxy (CursorResult): サーバーサイドカーソルの実行結果
+            chunk_size (int): 一度に取得する行数
+            transaction (Transaction): クエリを実行したトランザクション
+
+        Yields:
+            Sequence[Row]: chunk_size行以下の結果
         """
-        return database_exists(self.engine.url)
+        try:
+            with result_proxy:
+                yield from result_proxy.partitions(chunk_size)
+        except SQLAlchemyError:
+            if self.trans and self.trans[-1] is transaction:
+                self.rollback_transaction()
+            raise
 
-    def get_table_schema(self, table_name: str) -> list[ReflectedColumn]:
+    @staticmethod
+    def _fetch_result(result_proxy: CursorResult, verb: str) -> Any:
         """
-        指定されたテーブルのスキーマを返す。
+        クエリの種類に応じて実行結果を取り出す。
 
         Args:
-            table_name (str): テーブル名
+            result_proxy (CursorResult): クエリの実行結果
+            verb (str): 実行したクエリの最初の単語
 
         Returns:
-            dict: テーブルのスキーマ
+            SELECT文やRETURNINGつきの文など行を返す場合は結果セット、
+            INSERT文の場合は最後の行ID、その他の場合は影響を受けた行数。
         """
-        inspector = inspect(self.engine)
-        return inspector.get_columns(table_name)
+        if result_proxy.returns_rows:
+            return result_proxy.fetchall()
+        if verb == "INSERT":
+            return result_proxy.lastrowid  # 挿入された行のIDを返す
+        return result_proxy.rowcount  # 影響を受けた行数を返す
 
-    def get_table_column_and_type(self, table_name: str) -> dict[str, str]:
+    @_error_shared_connection_in_transaction
+    def read_query(self, query: str | TextClause, **params) -> list[Row]:
         """
-        指定されたテーブルのカラムと型を返す。
+        読み取り専用のクエリをAUTOCOMMITのコネクションで実行し、結果を返す。
+        BEGINとCOMMITを送らないため、1回の往復で結果を取得できる。
+        呼び出し元のスレッドのトランザクションとは別のコネクションを使うため、
+        コミットされていない変更は見えない。
+        StaticPoolのエンジン(インメモリのsqlite)では別のコネクションを用意できないため、
+        トランザクションの開始中は呼び出せない。
 
         Args:
-            table_name (str): テーブル名
+            query (str | TextClause): 実行するselect文
+            **params: クエリに渡すパラメータ
 
         Returns:
-            dict: テーブルのカラムと型
+            list[Row]: クエリの結果
+
+        Raises:
+            SQLAlchemyError: StaticPoolのエンジンでトランザクションが開始されている場合
         """
-        if not self.exists_table(table_name):
-            raise ValueError(f"Table {table_name} does not exist.")
-        schema = self.get_table_schema(table_name)
-        return {column["name"]: str(column["type"]) for column in schema}
+        statement, _ = _prepare(query)
+        with self.engine.connect().execution_options(
+            isolation_level="AUTOCOMMIT"
+        ) as connection:
+            return list(connection.execute(statement, params))
 
-    def make_pd_type_dict_from_schema(self, table_name: str) -> dict[str, str]:
+    @_error_started_transaction
+    def execute_query_with_transaction(
+        self, query: str | TextClause, **params
+    ) -> Any:
         """
-        table_nameのテーブルのカラムと型をpandasの型に変換した辞書を返す。
+        与えられたクエリをトランザクション内で実行する。
+        共有のコネクションは使わず、プールから取得したコネクションで
+        トランザクションを開始し、終了時にコミット(エラー時はロールバック)する。
+        呼び出しごとに独立したコネクションを使うため、スレッド間の排他は
+        データベース側の行ロックに任せる。
+        開始中のトランザクションが行ロックを持っていると、別のコネクションから
+        同じ行を更新しようとして自分自身のロックを待ち続けてしまうため、
+        トランザクションの開始中に呼び出した場合はエラーを出す。
 
         Args:
-            table_name (str): テーブル名
+            query (str | TextClause): 実行するクエリ
+            **params: クエリに渡すパラメータ
 
         Returns:
-            dict: テーブルのカラムとpandasの型
+            クエリの結果。SELECT文の場合は結果セット、INSERT文の場合は最後の行ID、その他の場合は影響を受けた行数。
+
+        Raises:
+            SQLAlchemyError: トランザクションが開始されている場合
         """
-        schema_type = self.get_table_column_and_type(table_name)
-        return {
-            column: convert_sql_type_to_pd_type(sql_type)
-            for column, sql_type in schema_type.items()
-        }
+        with self.engine.begin() as connection:
+            statement, verb = _prepare(query)
+            result_proxy = connection.execute(statement, params)
+            return self._fetch_result(result_proxy, verb)
 
+    @_error_shared_connection_in_transaction
     def df_to_sql(
         self,
         df: pd.DataFrame,  # pylint: disable=C0103
@@ -359,18 +662,30 @@ class Database(metaclass=SingletonMeta):
                 "replace": テーブルを削除してから書き込む。
                 "append": テーブルに追加する。
                 Defaults to "append".
-        """
-        with self._lock:
-            df.to_sql(
-                table_name,
-                self.engine,
-                if_exists=if_exists,
-                index=False,
-                method="multi",
-            )
 
-    def __del__(self):
-        """
-        オブジェクトが破棄される前にデータベース接続を切断する。
+        psycopg2を使う場合はCOPY ... FROM STDINで一括して書き込み、
+        それ以外の場合はMULTI_INSERT_CHUNK_SIZE行ずつ複数行のINSERT文で書き込む。
+        書き込みには呼び出し元のスレッドとは別のコネクションを使うため、
+        StaticPoolのエンジンではトランザクションの開始中は呼び出せない。
+
+        Raises:
+            SQLAlchemyError: StaticPoolのエンジンでトランザクションが開始されている場合
         """
-        self.disconnect()
+        method: Literal["multi"] | Callable[..., int]
+        if self.engine.dialect.driver == "psycopg2":
+            method, chunksize = copy_from_csv, COPY_CHUNK_SIZE
+        else:
+            method, chunksize = "multi", MULTI_INSERT_CHUNK_SIZE
+        creates_table = if_exists == "replace" or not self.exists_table(
+            table_name
+        )
+        df.to_sql(
+            table_name,
+            self.engine,
+            if_exists=if_exists,
+            index=False,
+            chunksize=chunksize,
+            method=method,
+        )
+        if creates_table:
+            self.invalidate_schema_cache()
@@ -4,25 +4,30 @@ Databaseクラスを受け取り、リポジトリを返すファクトリクラ
 """
 
 from libs.sqlmy.database import Database
+from libs.sqlmy.repository.base import BaseRepository
 from libs.sqlmy.repository.log_data import LogDataRepository
 from libs.sqlmy.repository.stock_data import StockDataRepository
 
+# テーブル名とリポジトリクラスの対応表
+REPOSITORY_CLASSES: dict[str, type[BaseRepository]] = {
+    "stock_data": StockDataRepository,
+    "log_data": LogDataRepository,
+    # 他のテーブルのリポジトリもここに追加できます。
+}
+
 
 # pylint: disable=too-few-public-methods
 class RepositoryFactory:
     """
     Databaseクラスを受け取り、リポジトリを返すファクトリクラス。
+    リポジトリは初めて要求されたときに作成し、以降は同じものを返す。
     """
 
     def __init__(self, database: Database):
         self.database = database
-        self.repositories = {
-            "stock_data": StockDataRepository(self.database),
-            "log_data": LogDataRepository(self.database),
-            # 他のテーブルのリポジトリもここに追加できます。
-        }
+        self._repositories: dict[str, BaseRepository] = {}
 
-    def get_repository(self, table_name: str):
+    def get_repository(self, table_name: str) -> BaseRepository:
         """
         table_nameに対応するリポジトリを返す。
 
@@ -30,12 +35,18 @@ class RepositoryFactory:
             table_name (str): テーブル名
 
         Returns:
-            Repository: リポジトリ
+            BaseRepository: リポジトリ
 
         Raises:
             ValueError: テーブル名に対応するリポジトリが存在しない場合
         """
-        repo = self.repositories.get(table_name)
-        if not repo:
-            raise ValueError(f"No repository found for table: {table_name}")
+        repo = self._repositories.get(table_name)
+        if repo is None:
+            repository_class = REPOSITORY_CLASSES.get(table_name)
+            if repository_class is None:
+                raise ValueError(
+                    f"No repository found for table: {table_name}"
+                )
+            repo = repository_class(self.database)
+            self._repositories[table_name] = repo
         return repo
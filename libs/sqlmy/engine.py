@@ -0,0 +1,157 @@
+"""
+sqlalchemyのエンジンを作成し、プロセス内で共有するモジュール。
+"""
+import threading
+from typing import Any
+
+from sqlalchemy import Engine, create_engine, event, make_url
+from sqlalchemy.pool import Pool, StaticPool
+
+# コネクションプールの設定
+POOL_SIZE = 20
+MAX_OVERFLOW = 40
+POOL_RECYCLE_SECONDS = 1800
+
+# psycopg2でexecutemanyをまとめて送る際の1回あたりの行数
+INSERTMANYVALUES_PAGE_SIZE = 1000
+EXECUTEMANY_BATCH_PAGE_SIZE = 500
+
+
+def _engine_options(
+    engine_url: str, poolclass: type[Pool] | None = None
+) -> dict[str, Any]:
+    """
+    engine_urlに応じたcreate_engineの設定を返す。
+
+    QueuePoolはLIFOで取り出し、よく使うコネクションを使い回して
+    余ったコネクションが早く閉じられるようにする。
+    インメモリのsqliteはコネクションごとに別のデータベースになるため、
+    StaticPoolで1つのコネクションをスレッド間で共有する。
+    ファイルのsqliteはpool_sizeなどを受け付けないプールが使われる場合があるため、
+    設定を渡さない。
+    poolclassが指定された場合は、これらのプールの設定の代わりにpoolclassを使う。
+    psycopg2の場合は、executemanyのINSERTを複数行のVALUESに、
+    それ以外の文をexecute_batchにまとめて送る。
+
+    Args:
+        engine_url (str): sqlalchemyのエンジンURL
+        poolclass (type[Pool] | None, optional): 使用するプールのクラス。
+            Defaults to None.
+
+    Returns:
+        dict: create_engineに渡す設定
+    """
+    url = make_url(engine_url)
+    options: dict[str, Any]
+    if poolclass is not None:
+        options = {"poolclass": poolclass}
+    elif url.get_backend_name() == "sqlite":
+        if _is_file_sqlite(engine_url):
+            return {}
+        return {
+            "poolclass": StaticPool,
+            "connect_args": {"check_same_thread": False},
+        }
+    else:
+        options = {
+            "pool_size": POOL_SIZE,
+            "max_overflow": MAX_OVERFLOW,
+            "pool_pre_ping": True,
+            "pool_recycle": POOL_RECYCLE_SECONDS,
+            "pool_use_lifo": True,
+        }
+    if url.get_driver_name() == "psycopg2":
+        options.update(
+            executemany_mode="values_plus_batch",
+            insertmanyvalues_page_size=INSERTMANYVALUES_PAGE_SIZE,
+            executemany_batch_page_size=EXECUTEMANY_BATCH_PAGE_SIZE,
+        )
+    return options
+
+
+def _is_file_sqlite(engine_url: str) -> bool:
+    """
+    engine_urlがファイルに保存するsqliteのものかどうかを返す。
+
+    Args:
+        engine_url (str): sqlalchemyのエンジンURL
+
+    Returns:
+        bool: ファイルに保存するsqliteのURLかどうか
+    """
+    url = make_url(engine_url)
+    return url.get_backend_name() == "sqlite" and url.database not in (
+        None,
+        "",
+        ":memory:",
+    )
+
+
+def _enable_sqlite_wal(dbapi_connection, _connection_record):
+    """
+    sqliteの接続時にWALモードを有効にする。
+    synchronous=NORMALと組み合わせることで、コミットごとのfsyncを
+    チェックポイント時にまとめられる。
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def _freeze(value: Any) -> Any:
+    """
+    エンジンのキャッシュのキーに使えるよう、設定の値をハッシュ可能にする。
+    connect_argsのような辞書やリストは要素ごとにタプルへ変換する。
+
+    Args:
+        value (Any): create_engineに渡す設定の値
+
+    Returns:
+        Any: ハッシュ可能な値
+    """
+    if isinstance(value, dict):
+        return tuple(
+            sorted((key, _freeze(item)) for key, item in value.items())
+        )
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, set):
+        return frozenset(_freeze(item) for item in value)
+    return value
+
+
+# get_engineで作成したエンジン。キーはengine_url、poolclassと設定の組
+_engines: dict[tuple[Any, ...], Engine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(
+    engine_url: str, poolclass: type[Pool] | None, **engine_options
+) -> Engine:
+    """
+    engine_urlのエンジンを返す。
+    同じURLと設定には同じエンジンを返し、プロセス内でコネクションプールを共有する。
+
+    Args:
+        engine_url (str): sqlalchemyのエンジンURL
+        poolclass (type[Pool] | None): 使用するプールのクラス。
+            Noneの場合はengine_urlに応じたプールを使う。
+        **engine_options: create_engineに渡す設定。
+            engine_urlに応じた設定より優先される
+
+    Returns:
+        Engine: sqlalchemyのエンジン
+    """
+    key = (engine_url, poolclass, _freeze(engine_options))
+    with _engines_lock:
+        if key not in _engines:
+            options = {
+                **_engine_options(engine_url, poolclass),
+                **engine_options,
+            }
+            engine = create_engine(engine_url, **options)
+            if _is_file_sqlite(engine_url):
+                event.listen(engine, "connect", _enable_sqlite_wal)
+            _engines[key] = engine
+        return _engines[key]
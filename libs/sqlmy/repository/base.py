@@ -0,0 +1,136 @@
+"""
+リポジトリの基底クラスのモジュール。
+"""
+from functools import lru_cache
+from typing import Any
+
+from sqlalchemy import Row, Select, Table, Update, bindparam, insert, select
+
+from libs.sqlmy.database import Database
+
+
+@lru_cache(maxsize=512)
+def _select_statement(table: Table, columns: tuple[str, ...]) -> Select:
+    """
+    columnsの各カラムが一致する行を取得するSELECT文を返す。
+    同じテーブルとカラムの組み合わせには同じ文を返すため、
+    sqlalchemyのコンパイル済みのキャッシュがそのまま使われる。
+
+    Args:
+        table (Table): 取得するテーブル
+        columns (tuple[str, ...]): 条件に使うカラム名。パラメータ名も同じになる
+
+    Returns:
+        Select: SELECT文
+    """
+    return select(table).where(
+        *(table.c[column] == bindparam(column) for column in columns)
+    )
+
+
+@lru_cache(maxsize=512)
+def _update_statement(
+    table: Table, columns: tuple[str, ...], where_columns: tuple[str, ...]
+) -> Update:
+    """
+    where_columnsの各カラムが一致する行のcolumnsを更新するUPDATE文を返す。
+
+    Args:
+        table (Table): 更新するテーブル
+        columns (tuple[str, ...]): 更新するカラム名。パラメータ名も同じになる
+        where_columns (tuple[str, ...]): 条件に使うカラム名。
+            パラメータ名は"where_"を先頭につけた名前になる
+
+    Returns:
+        Update: UPDATE文
+    """
+    return (
+        table.update()
+        .where(
+            *(
+                table.c[column] == bindparam(f"where_{column}")
+                for column in where_columns
+            )
+        )
+        .values({column: bindparam(column) for column in columns})
+    )
+
+
+class BaseRepository:
+    """
+    テーブルごとのリポジトリの基底クラス。
+    よく使うINSERT文とSELECT文は作成時に一度だけ組み立て、
+    呼び出しのたびにクエリを組み立て直さないようにする。
+    条件によって変わるSELECT文とUPDATE文は、カラムの組み合わせごとにキャッシュする。
+
+    Attributes:
+        database (Database): データベース
+        table (Table): リポジトリが扱うテーブル
+    """
+
+    table: Table
+
+    def __init__(self, database: Database):
+        self.database = database
+        self._insert_stmt = insert(self.table)
+
+    def bulk_insert(self, rows: list[dict[str, Any]]):
+        """
+        複数の行を1つのトランザクションでまとめて書き込む。
+        行のリストはexecutemanyとしてドライバに渡される。
+
+        Args:
+            rows (list[dict]): カラム名と値の辞書のリスト
+        """
+        if not rows:
+            return
+        with self.database.engine.begin() as connection:
+            connection.execute(self._insert_stmt, rows)
+
+    def get_by_id(self, row_id: int) -> Row | None:
+        """
+        idに対応する行を返す。
+
+        Args:
+            row_id (int): 行のid
+
+        Returns:
+            Row | None: idに対応する行。存在しない場合はNone
+        """
+        with self.database.engine.connect() as connection:
+            return connection.execute(
+                _select_statement(self.table, ("id",)), {"id": row_id}
+            ).first()
+
+    def find_by(self, **filters) -> list[Row]:
+        """
+        すべての条件に一致する行を返す。
+
+        Args:
+            **filters: カラム名と値の組み合わせ
+
+        Returns:
+            list[Row]: 条件に一致する行
+        """
+        statement = _select_statement(self.table, tuple(sorted(filters)))
+        with self.database.engine.connect() as connection:
+            return list(connection.execute(statement, filters))
+
+    def update_by_id(self, row_id: int, **values) -> int:
+        """
+        idに対応する行を更新する。
+
+        Args:
+            row_id (int): 行のid
+            **values: 更新するカラム名と値の組み合わせ
+
+        Returns:
+            int: 更新された行数
+        """
+        statement = _update_statement(
+            self.table, tuple(sorted(values)), ("id",)
+        )
+        with self.database.engine.begin() as connection:
+            return connection.execute(
+                statement, {**values, "where_id": row_id}
+            ).rowcount
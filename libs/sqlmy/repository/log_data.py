@@ -1,17 +1,14 @@
 """
-stock_dataテーブルのリポジトリモジュール。
+logsテーブルのリポジトリモジュール。
 """
 
-from libs.sqlmy.database import Database
 from libs.sqlmy.models import logs
+from libs.sqlmy.repository.base import BaseRepository
 
 
-# pylint: disable=too-few-public-methods
-class LogDataRepository:
+class LogDataRepository(BaseRepository):
     """
-    stock_dataテーブルのリポジトリクラス。
+    logsテーブルのリポジトリクラス。
     """
 
-    def __init__(self, database: Database):
-        self.database = database
-        self.table = logs
+    table = logs
@@ -2,16 +2,13 @@
 stock_dataテーブルのリポジトリモジュール。
 """
 
-from libs.sqlmy.database import Database
 from libs.sqlmy.models import stock_data
+from libs.sqlmy.repository.base import BaseRepository
 
 
-# pylint: disable=too-few-public-methods
-class StockDataRepository:
+class StockDataRepository(BaseRepository):
     """
     stock_dataテーブルのリポジトリクラス。
     """
 
-    def __init__(self, database: Database):
-        self.database = database
-        self.table = stock_data
+    table = stock_data
@@ -0,0 +1,295 @@
+"""
+データベースのスキーマを操作し、スキーマ情報をキャッシュするモジュール。
+"""
+from sqlalchemy import Engine, MetaData, inspect
+from sqlalchemy.engine import Inspector
+from sqlalchemy.engine.interfaces import ReflectedColumn
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy_utils import create_database, database_exists, drop_database
+
+from libs.utils.convert_type.pandas_sql import convert_sql_type_to_pd_type
+
+
+class SchemaCache:
+    """
+    Databaseがキャッシュするスキーマ情報。
+    DDLを実行した場合はclearで破棄する。
+
+    Attributes:
+        inspector (Inspector | None): スキーマの取得に使うInspector
+        table_exists (dict[str, bool]): テーブルごとの存在の有無
+        columns (dict[str, list[ReflectedColumn]]): テーブルごとのカラムの定義
+        column_types (dict[str, dict[str, str]]): テーブルごとのカラムと型
+        pd_types (dict[str, dict[str, str]]): テーブルごとのカラムとpandasの型
+        tables_created (bool): metadataのテーブルを作成済みかどうか
+    """
+
+    def __init__(self):
+        """
+        SchemaCacheのコンストラクタ。
+        """
+        self.inspector: Inspector | None = None
+        self.table_exists: dict[str, bool] = {}
+        self.columns: dict[str, list[ReflectedColumn]] = {}
+        self.column_types: dict[str, dict[str, str]] = {}
+        self.pd_types: dict[str, dict[str, str]] = {}
+        self.tables_created = False
+
+    def get_inspector(self, engine: Engine) -> Inspector:
+        """
+        スキーマの取得に使うInspectorを返す。
+        Inspectorは初回に作成し、clearが呼ばれるまで使い回す。
+
+        Args:
+            engine (Engine): Inspectorを作成するエンジン
+
+        Returns:
+            Inspector: engineのInspector
+        """
+        if self.inspector is None:
+            self.inspector = inspect(engine)
+        return self.inspector
+
+    def clear(self):
+        """
+        キャッシュしているスキーマ情報を破棄する。
+        """
+        self.inspector = None
+        self.table_exists.clear()
+        self.columns.clear()
+        self.column_types.clear()
+        self.pd_types.clear()
+        self.tables_created = False
+
+
+class SchemaMixin:
+    """
+    Databaseにテーブルとデータベースの作成、削除とスキーマの取得を追加するmixin。
+    取得したスキーマ情報はSchemaCacheにキャッシュし、
+    このクラスを経由したDDLの後に破棄する。
+
+    Attributes:
+        metadata (MetaData): sqlalchemyのMetaDataオブジェクト
+        engine (Engine): sqlalchemyのエンジン
+    """
+
+    metadata: MetaData
+    engine: Engine
+    _schema: SchemaCache
+
+    def connect(self):
+        """
+        データベースに接続する。Databaseで実装する。
+        """
+        raise NotImplementedError
+
+    def create_tables(self):
+        """
+        初期化されていない場合、初期化し、テーブルを作成する。
+        作成済みの場合はデータベースに問い合わせずに何もしない。
+        作成後、各テーブルのpandasの型の辞書を作成しておく。
+        pandasの型に変換できない型を含むテーブルは辞書を作成しない。
+        """
+        self.connect()
+        if self._schema.tables_created:
+            return
+        self.metadata.create_all(self.engine, checkfirst=True)
+        self.invalidate_schema_cache()
+        for table_name in self.metadata.tables:
+            try:
+                self.make_pd_type_dict_from_schema(table_name)
+            except ValueError:
+                continue
+        self._schema.tables_created = True
+
+    def refresh_reflection(self):
+        """
+        データベースに存在するテーブルの定義をmetadataに読み込む。
+        metadataに定義されていないテーブルを扱う場合に呼び出す。
+        """
+        self.metadata.reflect(bind=self.engine)
+        self.invalidate_schema_cache()
+
+    def create_table(self, table_name: str):
+        """
+        指定されたテーブルを作成する。すでに存在する場合は何もしない。
+
+        Args:
+            table_name (str): 作成するテーブルの名前。
+
+        Raises:
+            ValueError: テーブルがmetadataに登録されていない場合
+        """
+        if table_name not in self.metadata.tables:
+            raise ValueError(f"Table {table_name} is not defined in metadata.")
+        if self.exists_table(table_name):
+            return
+        self.metadata.create_all(
+            self.engine,
+            tables=[self.metadata.tables[table_name]],
+            checkfirst=True,
+        )
+        self.invalidate_schema_cache()
+
+    def get_registered_tables(self) -> list[str]:
+        """
+        metadataに登録されているテーブルの名前のリストを返す。
+        """
+        return list(self.metadata.tables.keys())
+
+    def exists_table(self, table_name: str) -> bool:
+        """
+        指定されたテーブルが存在するかどうかを返す。
+        テーブルごとにデータベースへ存在を問い合わせ、結果をキャッシュする。
+
+        Args:
+            table_name (str): テーブル名
+
+        Returns:
+            bool: テーブルが存在するかどうか
+        """
+        exists = self._schema.table_exists.get(table_name)
+        if exists is None:
+            exists = self._inspector.has_table(table_name)
+            self._schema.table_exists[table_name] = exists
+        return exists
+
+    @property
+    def _inspector(self) -> Inspector:
+        """
+        スキーマの取得に使うInspectorを返す。
+        Inspectorは初回に作成し、invalidate_schema_cacheが呼ばれるまで使い回す。
+        """
+        return self._schema.get_inspector(self.engine)
+
+    def invalidate_schema_cache(self):
+        """
+        キャッシュしているスキーマ情報を破棄する。
+        このクラスを経由せずにDDLを実行した場合は呼び出す必要がある。
+        """
+        self._schema.clear()
+
+    def drop_table(self, table_name: str):
+        """
+        指定されたテーブルを削除する。
+
+        Args:
+            table_name (str): テーブル名
+
+        Raises:
+            SQLAlchemyError: テーブルが存在しない場合
+        """
+        if self.exists_table(table_name):
+            self.metadata.tables[table_name].drop(self.engine)
+            self.invalidate_schema_cache()
+        else:
+            raise SQLAlchemyError(f"Table {table_name} does not exist.")
+
+    def drop_tables(self, table_names: list[str]):
+        """
+        指定されたテーブルをまとめて削除する。存在しないテーブルは無視する。
+        外部キーの依存関係を考慮した順序で削除される。
+
+        Args:
+            table_names (list[str]): テーブル名のリスト
+
+        Raises:
+            ValueError: テーブルがmetadataに登録されていない場合
+        """
+        undefined = [
+            name for name in table_names if name not in self.metadata.tables
+        ]
+        if undefined:
+            raise ValueError(
+                f"Tables {undefined} are not defined in metadata."
+            )
+        self.metadata.drop_all(
+            self.engine,
+            tables=[self.metadata.tables[name] for name in table_names],
+            checkfirst=True,
+        )
+        self.invalidate_schema_cache()
+
+    def create_database(self):
+        """
+        データベースを作成する。
+        """
+        if not database_exists(self.engine.url):
+            create_database(self.engine.url)
+
+    def drop_database(self):
+        """
+        データベースを削除する。
+        """
+        if database_exists(self.engine.url):
+            drop_database(self.engine.url)
+            self.invalidate_schema_cache()
+
+    def exists_database(self) -> bool:
+        """
+        データベースが存在するかどうかを返す。
+
+        Returns:
+            bool: データベースが存在するかどうか
+        """
+        return database_exists(self.engine.url)
+
+    def get_table_schema(self, table_name: str) -> list[ReflectedColumn]:
+        """
+        指定されたテーブルのスキーマを返す。
+        取得したスキーマはテーブルごとにキャッシュする。
+
+        Args:
+            table_name (str): テーブル名
+
+        Returns:
+            dict: テーブルのスキーマ
+        """
+        schema = self._schema.columns.get(table_name)
+        if schema is None:
+            schema = self._inspector.get_columns(table_name)
+            self._schema.columns[table_name] = schema
+        return schema
+
+    def get_table_column_and_type(self, table_name: str) -> dict[str, str]:
+        """
+        指定されたテーブルのカラムと型を返す。
+        結果はinvalidate_schema_cacheが呼ばれるまでキャッシュする。
+
+        Args:
+            table_name (str): テーブル名
+
+        Returns:
+            dict: テーブルのカラムと型
+        """
+        column_types = self._schema.column_types.get(table_name)
+        if column_types is None:
+            if not self.exists_table(table_name):
+                raise ValueError(f"Table {table_name} does not exist.")
+            schema = self.get_table_schema(table_name)
+            column_types = {
+                column["name"]: str(column["type"]) for column in schema
+            }
+            self._schema.column_types[table_name] = column_types
+        return dict(column_types)
+
+    def make_pd_type_dict_from_schema(self, table_name: str) -> dict[str, str]:
+        """
+        table_nameのテーブルのカラムと型をpandasの型に変換した辞書を返す。
+        変換結果はinvalidate_schema_cacheが呼ばれるまでキャッシュする。
+
+        Args:
+            table_name (str): テーブル名
+
+        Returns:
+            dict: テーブルのカラムとpandasの型
+        """
+        pd_types = self._schema.pd_types.get(table_name)
+        if pd_types is None:
+            schema_type = self.get_table_column_and_type(table_name)
+            pd_types = {
+                column: convert_sql_type_to_pd_type(sql_type)
+                for column, sql_type in schema_type.items()
+            }
+            self._schema.pd_types[table_name] = pd_types
+        return dict(pd_types)
@@ -0,0 +1,42 @@
+"""
+コネクションで開始したトランザクションを管理するモジュール。
+"""
+from sqlalchemy import Connection, Transaction
+
+
+class TransactionStack(list[Transaction]):
+    """
+    コネクションで開始したトランザクションのスタック。
+    最後に開始したトランザクションから順にコミットまたはロールバックする。
+    """
+
+    def begin(self, connection: Connection):
+        """
+        トランザクションを開始する。すでに開始されている場合は何もしない。
+
+        Args:
+            connection (Connection): トランザクションを開始するコネクション
+        """
+        if not self:
+            self.append(connection.begin())
+
+    def begin_nested(self, connection: Connection):
+        """
+        ネストされたトランザクション(SAVEPOINT)を開始する。
+
+        Args:
+            connection (Connection): トランザクションを開始するコネクション
+        """
+        self.append(connection.begin_nested())
+
+    def commit(self):
+        """
+        最後に開始したトランザクションをコミットする。
+        """
+        self.pop().commit()
+
+    def rollback(self):
+        """
+        最後に開始したトランザクションをロールバックする。
+        """
+        self.pop().rollback()
@@ -2,11 +2,21 @@
 pandasとsqlの型を変換するモジュール。
 """
 
+# sqlの型とpandasの型の対応表
+_SQL_TO_PD: dict[str, str] = {
+    "INTEGER": "Int64",
+    "FLOAT": "float64",
+    "DATETIME": "datetime64",
+    "VARCHAR": "object",
+}
+
 
 def convert_sql_type_to_pd_type(sql_type: str) -> str:
     """
     sqlの型をpandasの型に変換する。
 
+    VARCHAR(255)のように長さなどの引数がついた型は、引数を除いた型で変換する。
+
     Args:
         sql_type (str): sqlの型
 
@@ -16,12 +26,7 @@ def convert_sql_type_to_pd_type(sql_type: str) -> str:
     Raises:
         ValueError: サポートされていないsqlの型の場合
     """
-    if sql_type == "INTEGER":
-        return "Int64"
-    if sql_type == "FLOAT":
-        return "float64"
-    if sql_type == "DATETIME":
-        return "datetime64"
-    if sql_type == "VARCHAR":
-        return "object"
-    raise ValueError(f"Unsupported sql type: {sql_type}")
+    try:
+        return _SQL_TO_PD[sql_type.split("(", 1)[0]]
+    except KeyError as error:
+        raise ValueError(f"Unsupported sql type: {sql_type}") from error
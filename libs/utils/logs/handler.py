@@ -1,73 +1,184 @@
 """
 logをデータベースに書き込むモジュール
 """
+import atexit
 import logging
-
-from sqlalchemy.exc import IntegrityError, OperationalError, SQLAlchemyError
+import threading
+from datetime import datetime
+from queue import Empty, Full, Queue
 
 from libs.sqlmy.database import Database
+from libs.sqlmy.models import logs
 from libs.utils.time_zone.time import current_japan_time
 
+# 書き込むカラム。キューに積む行のタプルはこの順に並べる
+LOG_COLUMNS = (
+    "timestamp",
+    "log_level",
+    "message",
+    "logger_name",
+    "stack_trace",
+)
+
+LogRow = tuple[datetime, str, str, str, str | None]
+
 
 class DatabaseLogHandler(logging.Handler):
     """
     logをデータベースに書き込むハンドラ
+
+    emitはログをキューに積むだけで、データベースへの書き込みは
+    バックグラウンドのスレッドがbatch_size件ずつまとめて行う。
+
+    Attributes:
+        database (Database): 書き込み先のデータベース
+        batch_size (int): 1回のINSERTでまとめて書き込む最大件数
     """
 
-    def __init__(self, database: Database):
+    def __init__(
+        self,
+        database: Database,
+        batch_size: int = 500,
+        queue_size: int = 10000,
+    ):
+        """
+        DatabaseLogHandlerのコンストラクタ。
+
+        Args:
+            database (Database): 書き込み先のデータベース
+            batch_size (int, optional): 1回のINSERTでまとめて書き込む最大件数。
+                Defaults to 500.
+            queue_size (int, optional): 書き込み待ちのログを保持する最大件数。
+                溢れたログは破棄される。Defaults to 10000.
+        """
         super().__init__()
         self.database = database
+        self.batch_size = batch_size
+        # コンパイル済みの文がキャッシュされるよう、INSERT文は一度だけ作る
+        self._stmt = logs.insert()
+        # LogRecordはexc_infoのトレースバックを保持するため、
+        # キューには書き込む行だけを積む
+        self._queue: Queue[LogRow | None] = Queue(maxsize=queue_size)
+        self._writer = threading.Thread(
+            target=self._writer_loop, name="DatabaseLogWriter", daemon=True
+        )
+        self._writer.start()
+        atexit.register(self.close)
 
     def emit(self, record: logging.LogRecord):
         """
-        logをデータベースに書き込む
+        logを書き込み待ちのキューに積む
 
         Args:
             record (logging.LogRecord): ログレコード
-
-        Raises:
-            Exception: データベースへの書き込みに失敗した場合
         """
         # ログメッセージをフォーマット
         log_entry = self.format(record)
-        timestamp = current_japan_time()
+        row = (
+            current_japan_time(),
+            record.levelname,
+            log_entry,
+            record.name,
+            record.exc_text,  # 例外のスタックトレース
+        )
+        try:
+            self._queue.put_nowait(row)
+        except Full:
+            # キューが溢れた場合はログを破棄する
+            self.handleError(record)
+
+    def flush(self):
+        """
+        キューに積まれたログがすべて書き込まれるまで待つ。
+        """
+        if self._writer.is_alive():
+            self._queue.join()
+
+    def close(self):
+        """
+        残っているログを書き込んでから書き込みスレッドを停止し、ハンドラを閉じる。
+        閉じたハンドラがatexitから参照され続けないよう、登録も解除する。
+        """
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        atexit.unregister(self.close)
+        super().close()
+
+    def _writer_loop(self):
+        """
+        キューからログを取り出し、batch_size件ずつまとめて書き込む。
+        Noneを受け取ると終了する。
+        """
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except Empty:
+                    break
+            rows = [row for row in batch if row is not None]
+            if rows:
+                self._write(rows)
+            for _ in batch:
+                self._queue.task_done()
+            if len(rows) < len(batch):
+                return
+
+    def _write(self, rows: list[LogRow]):
+        """
+        ログをまとめて1つのトランザクションでデータベースに書き込む。
+        まとめて書き込めない場合は1行ずつ書き込み直し、
+        書き込めなかった行をhandleErrorで報告する。
+        ここで例外を送出すると書き込みスレッドが停止するため、すべて捕捉する。
 
-        # ログエントリをデータベースに書き込む
+        Args:
+            rows (list[LogRow]): 書き込む行のリスト
+        """
         try:
-            self.database.connect()
-            self.database.start_transaction()
-            query = """
-            INSERT INTO logs (
-                timestamp, log_level, message, logger_name, stack_trace
-            )
-            VALUES (
-                :timestamp, :log_level, :message, :logger_name, :stack_trace
-            )
-            """
-            self.database.execute_query(
-                query,
-                timestamp=timestamp,
-                log_level=record.levelname,
-                message=log_entry,
-                logger_name=record.name,
-                stack_trace=record.exc_text,  # 例外のスタックトレース
+            self._insert(rows)
+        except Exception:  # pylint: disable=broad-exception-caught
+            for row in rows:
+                try:
+                    self._insert([row])
+                except Exception:  # pylint: disable=broad-exception-caught
+                    self.handleError(_record_from_row(row))
+
+    def _insert(self, rows: list[LogRow]):
+        """
+        行を1つのトランザクションでデータベースに書き込む。
+
+        Args:
+            rows (list[LogRow]): 書き込む行のリスト
+        """
+        with self.database.engine.begin() as connection:
+            connection.execute(
+                self._stmt, [dict(zip(LOG_COLUMNS, row)) for row in rows]
             )
-            self.database.commit_transaction()
-            self.database.disconnect()
-        # except Exception:
-        #     self.handleError(record)
-        except IntegrityError:
-            self.handleError(record)
-        except OperationalError:
-            self.handleError(record)
-        except SQLAlchemyError:
-            self.handleError(record)
+
+
+def _record_from_row(row: LogRow) -> logging.LogRecord:
+    """
+    handleErrorで報告するため、書き込めなかった行からLogRecordを作る。
+
+    Args:
+        row (LogRow): 書き込めなかった行
+
+    Returns:
+        logging.LogRecord: 行のロガー名、レベルとメッセージを持つLogRecord
+    """
+    _, level_name, message, logger_name, _ = row
+    return logging.makeLogRecord(
+        {"name": logger_name, "levelname": level_name, "msg": message}
+    )
 
 
 # ログハンドラとロガーのセットアップ
 def setup_logging(database: Database) -> logging.Logger:
     """
     loggingモジュールの設定を行う
+    すでに追加されているDatabaseLogHandlerは閉じてから取り除き、
+    繰り返し呼び出してもハンドラが重複しないようにする。
 
     Args:
         database (Database): データベースインスタンス
@@ -78,6 +189,11 @@ def setup_logging(database: Database) -> logging.Logger:
     logger = logging.getLogger()
     logger.setLevel(logging.DEBUG)
 
+    for existing in list(logger.handlers):
+        if isinstance(existing, DatabaseLogHandler):
+            logger.removeHandler(existing)
+            existing.close()
+
     handler = DatabaseLogHandler(database)
     formatter = logging.Formatter("%(message)s")
     handler.setFormatter(formatter)
@@ -29,8 +29,13 @@ class SingletonMeta(type):
         """
         インスタンスが存在しない場合はインスタンスを作成し、
         存在する場合は既存のインスタンスを返す。
+        作成済みの場合はロックを取らずに返し(dictの参照はGIL下でアトミック)、
+        未作成の場合のみロックを取って再確認してから作成する。
         """
+        instance = cls._instances.get(cls)
+        if instance is not None:
+            return instance
         with cls._lock:
             if cls not in cls._instances:
                 cls._instances[cls] = super().__call__(*args, **kwargs)
-        return cls._instances[cls]
+            return cls._instances[cls]
@@ -2,12 +2,14 @@
 時間に関するユーティリティ
 """
 from datetime import datetime
+from zoneinfo import ZoneInfo
 
-import pytz
+# 日本時間のタイムゾーン。呼び出しのたびに取得しないよう、読み込み時に一度だけ作成する
+_JST = ZoneInfo("Asia/Tokyo")
 
 
 def current_japan_time():
     """
     現在の日本時間を返す
     """
-    return datetime.now(pytz.timezone("Asia/Tokyo"))
+    return datetime.now(_JST)
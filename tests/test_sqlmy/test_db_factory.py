@@ -19,6 +19,15 @@ class TestDbFactory:
         assert repo.database == db_instance
         assert repo.table.name == "stock_data"
 
+    def test_get_repository_cached(self, db_instance: Database):
+        """
+        同じテーブル名に対して同じリポジトリが返されることを確認するテストメソッド。
+        """
+        factory = RepositoryFactory(db_instance)
+        assert factory.get_repository("log_data") is factory.get_repository(
+            "log_data"
+        )
+
     def test_get_repository_with_invalid_table_name(self, db_instance):
         """
         存在しないテーブル名を指定した場合、ValueErrorが発生することを
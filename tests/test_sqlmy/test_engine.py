@@ -0,0 +1,31 @@
+"""
+engine.pyのテスト
+"""
+from sqlalchemy.pool import StaticPool
+
+from libs.sqlmy.engine import get_engine
+
+
+class TestGetEngine:
+    """
+    engine.get_engineのテスト。データベースには接続しない
+    """
+
+    def test_engine_shared_with_connect_args(self):
+        """辞書を含む設定でも同じエンジンが使われることを確認する"""
+        engine = get_engine(
+            "sqlite://", None, connect_args={"check_same_thread": False}
+        )
+        assert (
+            get_engine(
+                "sqlite://", None, connect_args={"check_same_thread": False}
+            )
+            is engine
+        )
+        engine.dispose()
+
+    def test_memory_sqlite_static_pool(self):
+        """インメモリのsqliteではStaticPoolが使われることを確認する"""
+        engine = get_engine("sqlite://", None)
+        assert isinstance(engine.pool, StaticPool)
+        engine.dispose()
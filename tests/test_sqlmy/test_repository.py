@@ -0,0 +1,60 @@
+"""
+repositoryのテスト
+"""
+from libs.sqlmy.database import Database
+from libs.sqlmy.repository.log_data import LogDataRepository
+
+
+class TestBaseRepository:
+    """
+    BaseRepositoryのテストクラス。
+    """
+
+    def test_bulk_insert(self, db_instance: Database):
+        """
+        bulk_insertで書き込んだ行がget_by_idで取得できることを確認する。
+        """
+        repo = LogDataRepository(db_instance)
+        repo.bulk_insert(
+            [
+                {"log_level": "INFO", "message": "bulk insert 1"},
+                {"log_level": "INFO", "message": "bulk insert 2"},
+            ]
+        )
+        try:
+            result = db_instance.execute_query_with_transaction(
+                "SELECT id FROM logs WHERE message = :message",
+                message="bulk insert 2",
+            )
+            row = repo.get_by_id(result[0].id)
+            assert row is not None
+            assert row.message == "bulk insert 2"
+        finally:
+            db_instance.execute_query_with_transaction(
+                "DELETE FROM logs WHERE message LIKE 'bulk insert %'"
+            )
+
+    def test_get_by_id_not_found(self, db_instance: Database):
+        """
+        存在しないidの場合にNoneが返されることを確認する。
+        """
+        repo = LogDataRepository(db_instance)
+        assert repo.get_by_id(-1) is None
+
+    def test_find_by_and_update_by_id(self, db_instance: Database):
+        """
+        update_by_idで更新した行がfind_byで取得できることを確認する。
+        """
+        repo = LogDataRepository(db_instance)
+        repo.bulk_insert([{"log_level": "INFO", "message": "find by 1"}])
+        try:
+            (row,) = repo.find_by(log_level="INFO", message="find by 1")
+            assert repo.update_by_id(row.id, message="find by 2") == 1
+            assert not repo.find_by(message="find by 1")
+            updated = repo.get_by_id(row.id)
+            assert updated is not None
+            assert updated.message == "find by 2"
+        finally:
+            db_instance.execute_query_with_transaction(
+                "DELETE FROM logs WHERE message LIKE 'find by %'"
+            )
@@ -0,0 +1,50 @@
+"""
+transaction.TransactionStackのテスト
+"""
+from unittest.mock import MagicMock
+
+from libs.sqlmy.transaction import TransactionStack
+
+
+class TestTransactionStack:
+    """
+    transaction.TransactionStackのテスト。データベースには接続しない
+    """
+
+    def test_commit(self):
+        """トランザクションが開始され、コミットされることを確認する"""
+        connection = MagicMock()
+        stack = TransactionStack()
+        stack.begin(connection)
+        assert stack == [connection.begin.return_value]
+        stack.commit()
+        assert not stack
+        connection.begin.return_value.commit.assert_called_once()
+
+    def test_rollback(self):
+        """トランザクションがロールバックされることを確認する"""
+        connection = MagicMock()
+        stack = TransactionStack()
+        stack.begin(connection)
+        stack.rollback()
+        assert not stack
+        connection.begin.return_value.rollback.assert_called_once()
+
+    def test_begin_twice(self):
+        """開始済みの場合は2つ目のトランザクションが開始されないことを確認する"""
+        connection = MagicMock()
+        stack = TransactionStack()
+        stack.begin(connection)
+        stack.begin(connection)
+        assert len(stack) == 1
+        connection.begin.assert_called_once()
+
+    def test_nested(self):
+        """ネストされたトランザクションが後から終了されることを確認する"""
+        connection = MagicMock()
+        stack = TransactionStack()
+        stack.begin(connection)
+        stack.begin_nested(connection)
+        stack.rollback()
+        connection.begin_nested.return_value.rollback.assert_called_once()
+        assert stack == [connection.begin.return_value]
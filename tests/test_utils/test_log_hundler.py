@@ -2,12 +2,59 @@
 log_hundler.py テスト
 """
 
+import gc
 import logging
+import weakref
+from typing import Generator
 
 import pytest
 
 from libs.sqlmy.database import Database
-from libs.utils.logs.handler import setup_logging
+from libs.utils.logs.handler import DatabaseLogHandler, setup_logging
+
+# pylint: disable=redefined-outer-name
+
+
+@pytest.fixture(scope="module")
+def database_logger(
+    db_engine: Database,
+) -> Generator[logging.Logger, None, None]:
+    """
+    モジュール内のテストで共有する、データベースに書き込むロガーを返す
+    """
+    root_logger = setup_logging(db_engine)
+    yield root_logger
+    remove_database_handlers(root_logger)
+
+
+@pytest.fixture
+def logger(
+    database_logger: logging.Logger, db_instance: Database
+) -> logging.Logger:
+    """
+    logsテーブルを空にしてから、データベースに書き込むロガーを返す
+    """
+    flush_handlers(database_logger)
+    db_instance.execute_query_with_transaction("TRUNCATE logs")
+    return database_logger
+
+
+def remove_database_handlers(logger: logging.Logger):
+    """
+    loggerからDatabaseLogHandlerを取り除いて閉じる
+    """
+    for handler in list(logger.handlers):
+        if isinstance(handler, DatabaseLogHandler):
+            logger.removeHandler(handler)
+            handler.close()
+
+
+def flush_handlers(logger: logging.Logger):
+    """
+    loggerのハンドラに積まれたログをすべて書き込ませる
+    """
+    for handler in logger.handlers:
+        handler.flush()
 
 
 class TestLogDatabase:
@@ -15,37 +62,109 @@ class TestLogDatabase:
     logをデータベースに書き込むテスト
     """
 
-    def test_log_database(self, db_instance: Database):
+    def test_log_database(self, db_instance: Database, logger: logging.Logger):
         """
         logのmessageがデータベースに書き込まれることを確認する
         """
-        logger = setup_logging(db_instance)
         logger.info("test")
+        flush_handlers(logger)
         db_instance.connect()
         db_instance.start_transaction()
         result = db_instance.execute_query("SELECT * FROM logs")
-        assert result[0].message == "test"
+        assert [row.message for row in result] == ["test"]
 
-    @pytest.mark.parametrize(
-        "level,message",
-        [
+    def test_log_levels(self, db_instance: Database, logger: logging.Logger):
+        """
+        logのlevelがデータベースに書き込まれることを確認する
+        """
+        cases = [
             (logging.DEBUG, "This is a debug message"),
             (logging.INFO, "This is an info message"),
             (logging.WARNING, "This is a warning message"),
             (logging.ERROR, "This is an error message"),
             (logging.CRITICAL, "This is a critical message"),
-        ],
-    )
-    def test_log_levels(self, db_instance: Database, level, message):
+        ]
+        for level, message in cases:
+            logger.log(level, message)
+        flush_handlers(logger)
+
+        result = db_instance.read_query(
+            "SELECT log_level, message FROM logs"
+            " WHERE message = ANY(:messages)",
+            messages=[message for _, message in cases],
+        )
+
+        assert {row.message: row.log_level for row in result} == {
+            message: logging.getLevelName(level) for level, message in cases
+        }
+
+    def test_log_batch(self, db_instance: Database, logger: logging.Logger):
         """
-        logのlevelがデータベースに書き込まれることを確認する
+        batch_sizeを超える件数のlogがすべてデータベースに書き込まれることを確認する
         """
-        logger = setup_logging(db_instance)
-        logger.setLevel(level)
-        logger.log(level, message)
+        for i in range(1200):
+            logger.info("batch message %d", i)
+        flush_handlers(logger)
 
         db_instance.start_transaction()
-        query = "SELECT log_level FROM logs WHERE message = :message"
-        result = db_instance.execute_query(query, message=message)
+        query = (
+            "SELECT COUNT(*) FROM logs WHERE message LIKE 'batch message %'"
+        )
+        result = db_instance.execute_query(query)
 
-        assert result[0].log_level == logging.getLevelName(level)
+        assert result[0][0] == 1200
+
+    def test_write_error_keeps_writer(
+        self, db_instance: Database, monkeypatch: pytest.MonkeyPatch
+    ):
+        """
+        書き込めない行があっても書き込みスレッドが止まらず、
+        その行だけがhandleErrorで報告されることを確認する
+        """
+        handler = DatabaseLogHandler(db_instance)
+        errors: list[logging.LogRecord] = []
+        monkeypatch.setattr(handler, "handleError", errors.append)
+        try:
+            # NULを含む文字列はpsycopg2がValueErrorで拒否する
+            for message in ["nul \x00 message", "after nul message"]:
+                handler.handle(logging.makeLogRecord({"msg": message}))
+            handler.flush()
+
+            assert handler._writer.is_alive()  # pylint: disable=W0212
+            assert [record.msg for record in errors] == ["nul \x00 message"]
+            result = db_instance.read_query(
+                "SELECT COUNT(*) FROM logs WHERE message = 'after nul message'"
+            )
+            assert result[0][0] == 1
+        finally:
+            handler.close()
+            db_instance.execute_query_with_transaction(
+                "DELETE FROM logs WHERE message = 'after nul message'"
+            )
+
+    def test_setup_logging_replaces_handler(self, db_instance: Database):
+        """
+        setup_loggingを繰り返し呼び出してもハンドラが重複しないことを確認する
+        """
+        setup_logging(db_instance)
+        root_logger = setup_logging(db_instance)
+        try:
+            handlers = [
+                handler
+                for handler in root_logger.handlers
+                if isinstance(handler, DatabaseLogHandler)
+            ]
+            assert len(handlers) == 1
+        finally:
+            remove_database_handlers(root_logger)
+
+    def test_closed_handler_released(self, db_instance: Database):
+        """
+        閉じたハンドラがatexitから参照され続けないことを確認する
+        """
+        handler = DatabaseLogHandler(db_instance)
+        handler_ref = weakref.ref(handler)
+        handler.close()
+        del handler
+        gc.collect()
+        assert handler_ref() is None
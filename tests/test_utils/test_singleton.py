@@ -2,7 +2,8 @@
 singleton.pyのテスト
 """
 import threading
-import time
+
+import pytest
 
 from libs.utils.singleton import SingletonMeta
 
@@ -39,18 +40,17 @@ class TestSingleton:
             """test用のスレッドセーフなシングルトンクラス"""
 
             def __init__(self):
-                # `time.sleep(0.1)` はここでの重要な役割を果たします。具体的には、
-                # この遅延は複数のスレッドがほぼ同時にシングルトンのインスタンスを生成しようとするシナリオをシミュレートするためのものです。
-                # スレッドセーフティの保証は、多くの場面で非常に短い時間窓内での同時アクセスが問題となるため、このようなシミュレーションは非常に重要です。
-                # この`sleep`がない場合、テスト中のすべてのスレッドが非常に迅速に完了してしまい、実際の多重アクセスシナリオを正確に反映しない可能性があります。
-                # したがって、この遅延は、ロックメカニズムが実際の同時アクセスシナリオで正しく動作することを確認するために意図的に追加されています。
-                time.sleep(0.1)
                 self.value = 0
 
         # pylint: enable=too-few-public-methods
         instances = []
 
+        # すべてのスレッドがそろってから同時にインスタンスを作成させ、
+        # スリープで待たずに作成の競合を起こす
+        barrier = threading.Barrier(10)
+
         def create_instance():
+            barrier.wait()
             instance = ThreadSafeSingletonClass()
             instances.append(instance)
 
@@ -64,3 +64,26 @@ class TestSingleton:
         # すべてのインスタンスが同一であることを確認
         for instance in instances[1:]:
             assert instances[0] is instance
+
+    def test_singleton_fast_path_without_lock(
+        self, monkeypatch: pytest.MonkeyPatch
+    ):
+        """作成済みのインスタンスはロックを取らずに返されることを確認する"""
+
+        # pylint: disable=too-few-public-methods
+        class FastPathSingletonClass(metaclass=SingletonMeta):
+            """test用のシングルトンクラス"""
+
+        class FailingLock:
+            """取得しようとすると失敗するロック"""
+
+            def __enter__(self):
+                raise AssertionError("lock was acquired")
+
+            def __exit__(self, *args):
+                return False
+
+        # pylint: enable=too-few-public-methods
+        instance = FastPathSingletonClass()
+        monkeypatch.setattr(FastPathSingletonClass, "_lock", FailingLock())
+        assert FastPathSingletonClass() is instance